@@ -1,13 +1,139 @@
 import os
+import errno
 import json
+import hashlib
 from datetime import datetime
 import subprocess
+import mmap
+import socket
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
+import numpy as np
 import time
-import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None  # Only needed when COMPRESS_UPLOAD is enabled
+
+UPLOAD_BLOCKSIZE = 1024 * 1024  # Bytes read from the body per socket send
+UPLOAD_SNDBUF = 4 * 1024 * 1024
+
+class UploadHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with a larger socket send buffer and body read size for big uploads"""
+    def init_poolmanager(self, *args, **kwargs):
+        # Keep urllib3's TCP_NODELAY default and let the TCP window fill on high-latency links
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, UPLOAD_SNDBUF)
+        ]
+        kwargs['blocksize'] = UPLOAD_BLOCKSIZE
+        super().init_poolmanager(*args, **kwargs)
+
+# Shared session so the upload and the verify call reuse one pooled TLS connection
+SESSION = requests.Session()
+SESSION.mount('https://', UploadHTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # raise_on_status=False: a 5xx that outlasts the retries comes back as a response, so a
+    # failed verify only skips the size check instead of failing an upload that succeeded
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False)
+))
+
+CREDENTIALS_CACHE = os.path.expanduser('~/.cache/sf_upload_token.json')
+CREDENTIALS_TTL = 3600  # Seconds before `sf org display` is asked again
+
+def current_target_org():
+    """
+    Return the sf CLI's target org (alias or username) without starting the CLI.
+    Resolved in the same order as sf: SF_TARGET_ORG, the nearest project's
+    .sf/config.json, then ~/.sf/config.json. Returns None if no default is set.
+    """
+    if os.environ.get('SF_TARGET_ORG'):
+        return os.environ['SF_TARGET_ORG']
+    
+    directory = os.getcwd()
+    config_paths = []
+    while True:
+        config_paths.append(os.path.join(directory, '.sf', 'config.json'))
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    config_paths.append(os.path.expanduser('~/.sf/config.json'))
+    
+    for config_path in config_paths:
+        try:
+            with open(config_path) as f:
+                target_org = json.load(f).get('target-org')
+        except (OSError, ValueError):
+            continue
+        if target_org:
+            return target_org
+    return None
+
+def load_cached_credentials(target_org):
+    """Return (access_token, instance_url, username) cached for target_org, or None if missing or stale"""
+    try:
+        with open(CREDENTIALS_CACHE) as f:
+            cached = json.load(f).get(target_org or '')
+    except (OSError, ValueError, AttributeError):
+        return None
+    
+    if not cached or time.time() - cached.get('ts', 0) > CREDENTIALS_TTL:
+        return None
+    if cached.get('accessToken') and cached.get('instanceUrl'):
+        return cached['accessToken'], cached['instanceUrl'], cached.get('username')
+    return None
+
+def save_cached_credentials(target_org, access_token, instance_url, username):
+    """Store the credentials for target_org in the cache file, readable only by the current user"""
+    try:
+        with open(CREDENTIALS_CACHE) as f:
+            cache = json.load(f)
+        # Keep only per-org entries, which also drops the older single-entry format
+        cache = {org: entry for org, entry in cache.items() if isinstance(entry, dict)}
+    except (OSError, ValueError, AttributeError):
+        cache = {}
+    
+    cache[target_org or ''] = {
+        'accessToken': access_token,
+        'instanceUrl': instance_url,
+        'username': username,
+        'ts': time.time()
+    }
+    
+    try:
+        os.makedirs(os.path.dirname(CREDENTIALS_CACHE), exist_ok=True)
+        fd = os.open(CREDENTIALS_CACHE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"⚠ Could not cache credentials: {e}")
+
+def clear_cached_credentials():
+    """Delete the cache file after Salesforce rejects a token, so the next run asks sf again"""
+    try:
+        os.remove(CREDENTIALS_CACHE)
+        print(f"⚠ Access token rejected; removed {CREDENTIALS_CACHE}, run again to re-authenticate")
+    except FileNotFoundError:
+        pass
 
 def get_sf_credentials():
     """Get access token and instance URL from Salesforce CLI"""
+    target_org = current_target_org()
+    cached = load_cached_credentials(target_org)
+    if cached:
+        access_token, instance_url, username = cached
+        print(f"✓ Authenticated as: {username} (cached)")
+        print(f"✓ Instance: {instance_url}\n")
+        return access_token, instance_url
+    
     print("Getting credentials from Salesforce CLI...")
     
     try:
@@ -28,6 +154,7 @@ def get_sf_credentials():
             if access_token and instance_url:
                 print(f"✓ Authenticated as: {username}")
                 print(f"✓ Instance: {instance_url}\n")
+                save_cached_credentials(target_org, access_token, instance_url, username)
                 return access_token, instance_url
         
         return None, None
@@ -36,60 +163,244 @@ def get_sf_credentials():
         print(f"✗ Error: {e}")
         return None, None
 
+BATCH_ROWS = 100_000
+
+def generate_batches(target_size):
+    """Yield (bytes, row_count) batches of test data totalling exactly target_size bytes"""
+    target_size = int(target_size)  # Whole bytes, since the last row is padded to land on it exactly
+    header = b"ID\tName\tEmail\tAge\tCity\tCountry\tDate\tScore\tStatus\tDescription\n"
+    yield header, 0
+    current_size = len(header)
+    row_count = 0
+    
+    cities = ['NYC', 'LA', 'Chicago', 'Houston', 'Phoenix']
+    countries = ['USA', 'Canada', 'UK', 'Germany']
+    statuses = ['Active', 'Inactive', 'Pending']
+    
+    # City, country, date and status all cycle with the row ID and together repeat
+    # every lcm(5, 4, 28, 3) = 420 rows, so one lookup per row covers them. Object
+    # arrays so fancy indexing hands back the same Python str objects.
+    cycle = 420
+    places = np.array([
+        f"{cities[i % 5]}\t{countries[i % 4]}\t2024-01-{i % 28 + 1:02d}" for i in range(cycle)
+    ], dtype=object)
+    status_cycle = np.array([statuses[i % 3] for i in range(cycle)], dtype=object)
+    numbers = np.array([str(n) for n in range(101)], dtype=object)  # Ages and scores, pre-formatted
+    rng = np.random.default_rng()
+    
+    # Build rows a batch at a time; columns come from NumPy, not per-row Python calls.
+    # Every column is already a str, so the f-string below only concatenates.
+    while current_size < target_size:
+        ids = np.arange(row_count + 1, row_count + BATCH_ROWS + 1)
+        phase = ids % cycle
+        columns = zip(
+            map(str, ids.tolist()),
+            numbers[rng.integers(18, 81, BATCH_ROWS)].tolist(),
+            places[phase].tolist(),
+            numbers[rng.integers(0, 101, BATCH_ROWS)].tolist(),
+            status_cycle[phase].tolist()
+        )
+        rows = [
+            f"{i}\tUser{i}\tuser{i}@test.com\t{age}\t{place}\t{score}\t{status}\tDescription text data here for row {i}\n"
+            for i, age, place, score, status in columns
+        ]
+        
+        # Last batch: keep the rows that leave at least `reserve` bytes (more than any
+        # one row), then pad the next row's description so the total is exactly
+        # target_size; the size is then known before anything is generated.
+        # Row boundaries are only needed for that batch, so the others skip them.
+        remaining = target_size - current_size
+        reserve = 256
+        text = "".join(rows)
+        if len(text) > remaining - reserve:
+            row_ends = np.cumsum(np.fromiter(map(len, rows), dtype=np.int64, count=len(rows)))
+            keep = int(np.searchsorted(row_ends, remaining - reserve, side='right'))
+            rows = rows[:keep + 1]
+            used = int(row_ends[keep - 1]) if keep else 0
+            rows[-1] = rows[-1][:-1] + " " * (remaining - used - len(rows[-1])) + "\n"
+            text = "".join(rows)
+        
+        batch = text.encode('ascii')
+        current_size += len(batch)
+        row_count += len(rows)
+        yield batch, len(rows)
+
 def generate_file(filename, size_mb):
-    """Generate test file of specified size"""
-    target_size = size_mb * 1024 * 1024
-    current_size = 0
+    """Generate test file of specified size; returns the file's SHA-256 hex digest"""
+    target_size = int(size_mb * 1024 * 1024)  # size_mb may be fractional, e.g. 0.5 for a quick run
+    digest = hashlib.sha256()  # Hashed as it is written, so the sidecar needs no second read
+    pos = 0
     row_count = 0
     
     print(f"Generating {size_mb}MB test file: {filename}")
     
-    with open(filename, 'w', buffering=8192*1024) as f:
-        header = "ID\tName\tEmail\tAge\tCity\tCountry\tDate\tScore\tStatus\tDescription\n"
-        f.write(header)
-        current_size += len(header)
-        
-        cities = ['NYC', 'LA', 'Chicago', 'Houston', 'Phoenix']
-        countries = ['USA', 'Canada', 'UK', 'Germany']
-        statuses = ['Active', 'Inactive', 'Pending']
+    # Write batches straight into a mapping of the file sized to exactly what generate_batches yields
+    fd = os.open(filename, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            os.posix_fallocate(fd, 0, target_size)
+        except AttributeError:
+            os.ftruncate(fd, target_size)  # No posix_fallocate on macOS
+        except OSError as e:
+            # Only fall back when the filesystem cannot preallocate. Anything else, such as
+            # ENOSPC, must fail here: writes into a sparse mapping on a full disk die with SIGBUS
+            if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                os.remove(filename)
+                raise
+            os.ftruncate(fd, target_size)
         
-        while current_size < target_size:
-            row_count += 1
-            row = f"{row_count}\tUser{row_count}\tuser{row_count}@test.com\t{random.randint(18,80)}\t{cities[row_count%5]}\t{countries[row_count%4]}\t2024-01-{(row_count%28)+1:02d}\t{random.randint(0,100)}\t{statuses[row_count%3]}\tDescription text data here for row {row_count}\n"
-            f.write(row)
-            current_size += len(row)
+        with mmap.mmap(fd, target_size) as mm:
+            for batch, batch_rows in generate_batches(target_size):
+                mm[pos:pos + len(batch)] = batch
+                digest.update(batch)
+                pos += len(batch)
+                row_count += batch_rows
+                
+                if batch_rows and row_count % 500000 == 0:
+                    print(f"  Progress: {pos / (1024**2):.2f} MB ({row_count:,} rows)")
+    finally:
+        os.close(fd)
+    
+    actual_size = os.path.getsize(filename)
+    print(f"✓ Generated {actual_size / (1024**2):.2f} MB with {row_count:,} rows\n")
+    return digest.hexdigest()
+
+class HashingWriter:
+    """Write-through file wrapper that hashes every byte written to the underlying file"""
+    def __init__(self, file, digest):
+        self.file = file
+        self.digest = digest
+    
+    def write(self, data):
+        self.digest.update(data)
+        return self.file.write(data)
+    
+    def flush(self):
+        self.file.flush()
+
+def generate_compressed_file(filename, size_mb, level=3):
+    """Generate test file of specified (uncompressed) size straight into a zstd stream; returns the .zst file's SHA-256 hex digest"""
+    target_size = int(size_mb * 1024 * 1024)
+    current_size = 0
+    row_count = 0
+    
+    print(f"Generating {size_mb}MB test file (zstd level {level}): {filename}")
+    
+    # The uncompressed TSV never touches disk; batches go straight into the compressor
+    cctx = zstd.ZstdCompressor(level=level, threads=-1)
+    # The sidecar describes the .zst on disk, so the compressed output is what gets hashed
+    digest = hashlib.sha256()
+    with open(filename, 'wb') as raw, cctx.stream_writer(HashingWriter(raw, digest), closefd=False) as f:
+        for batch, batch_rows in generate_batches(target_size):
+            f.write(batch)
+            current_size += len(batch)
+            row_count += batch_rows
             
-            if row_count % 500000 == 0:
+            if batch_rows and row_count % 500000 == 0:
                 print(f"  Progress: {current_size / (1024**2):.2f} MB ({row_count:,} rows)")
     
     actual_size = os.path.getsize(filename)
-    print(f"✓ Generated {actual_size / (1024**2):.2f} MB with {row_count:,} rows\n")
-    return row_count
+    print(f"✓ Generated {current_size / (1024**2):.2f} MB with {row_count:,} rows "
+          f"({actual_size / (1024**2):.2f} MB compressed)\n")
+    return digest.hexdigest()
+
+def compress_file(src_path, dst_path, level=3):
+    """Compress an existing file with zstd for upload"""
+    print(f"Compressing {src_path} (zstd level {level})...")
+    
+    cctx = zstd.ZstdCompressor(level=level, threads=-1)
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        cctx.copy_stream(src, dst, read_size=1 << 20, write_size=1 << 20)
+    
+    src_size = os.path.getsize(src_path)
+    dst_size = os.path.getsize(dst_path)
+    print(f"✓ Compressed {src_size / (1024**2):.2f} MB to {dst_size / (1024**2):.2f} MB "
+          f"({src_size / dst_size:.1f}x)\n")
+
+def file_sha256(file_path):
+    """SHA-256 of a file, read in 1 MiB blocks (OpenSSL uses the CPU's SHA instructions when present)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-class FileWithProgress:
-    """Wrapper for file object to track upload progress"""
-    def __init__(self, file_path, callback=None):
-        self.file = open(file_path, 'rb')
-        self.total_size = os.path.getsize(file_path)
-        self.bytes_read = 0
-        self.callback = callback
-        self.start_time = time.time()
+def write_checksum(file_path, size_mb, compressed, digest=None):
+    """
+    Record the file's SHA-256, size and the settings it was generated with in a <file>.sha256 sidecar.
+    Pass the digest when it was computed while writing; otherwise the file is read back and hashed.
+    """
+    with open(f"{file_path}.sha256", 'w') as f:
+        json.dump({
+            'sha256': digest or file_sha256(file_path),
+            'size': os.path.getsize(file_path),
+            'size_mb': size_mb,
+            'compressed': compressed
+        }, f)
+
+def checksum_mismatch(file_path, size_mb, compressed):
+    """
+    Check the file against its <file>.sha256 sidecar and the current settings.
+    Returns None if the file can be reused as is, otherwise the reason it cannot.
+    The settings and size are compared before the file is hashed.
+    """
+    try:
+        with open(f"{file_path}.sha256") as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return f"No {file_path}.sha256 sidecar from a previous run"
+    
+    if recorded.get('size_mb') != size_mb or recorded.get('compressed') != compressed:
+        return (f"File was generated with FILE_SIZE_MB={recorded.get('size_mb')}, compressed={recorded.get('compressed')}; "
+                f"current settings are FILE_SIZE_MB={size_mb}, compressed={compressed}")
+    if recorded.get('size') != os.path.getsize(file_path):
+        return f"File size no longer matches {file_path}.sha256"
+    if file_sha256(file_path) != recorded.get('sha256'):
+        return f"SHA-256 no longer matches {file_path}.sha256 (the file changed after it was generated)"
+    return None
+
+BYTES_TO_MB = 1.0 / (1024 * 1024)
+
+class ProgressTicker:
+    """MultipartEncoderMonitor callback that prints upload progress every few seconds"""
+    __slots__ = ('start_time', 'interval', 'next_tick', 'last_time', 'last_bytes')
+    
+    def __init__(self, start_time, interval=2):
+        self.start_time = start_time
+        self.interval = interval
+        self.next_tick = start_time + interval
+        self.last_time = start_time
+        self.last_bytes = 0
+    
+    def __call__(self, monitor):
+        # Runs on every encoder read, so do nothing but a clock check until the next tick
+        now = time.monotonic()
+        if now < self.next_tick:
+            return
+        self.next_tick = now + self.interval
         
-    def read(self, size=-1):
-        data = self.file.read(size)
-        self.bytes_read += len(data)
+        bytes_read = monitor.bytes_read
+        total_size = monitor.len
+        elapsed = now - self.start_time
         
-        if self.callback:
-            elapsed = time.time() - self.start_time
-            self.callback(self.bytes_read, self.total_size, elapsed)
+        progress = (bytes_read / total_size) * 100
+        speed = (bytes_read * BYTES_TO_MB) / elapsed if elapsed > 0 else 0
         
-        return data
-    
-    def __enter__(self):
-        return self
-    
-    def __exit__(self, *args):
-        self.file.close()
+        # Calculate instantaneous speed
+        bytes_since_last = bytes_read - self.last_bytes
+        time_since_last = now - self.last_time
+        instant_speed = (bytes_since_last * BYTES_TO_MB) / time_since_last if time_since_last > 0 else 0
+        
+        eta = ((total_size - bytes_read) / (bytes_read / elapsed)) if bytes_read > 0 and elapsed > 0 else 0
+        
+        print(f"  Progress: {progress:.1f}% | "
+              f"Uploaded: {bytes_read * BYTES_TO_MB:.1f}/{total_size * BYTES_TO_MB:.1f} MB | "
+              f"Speed: {instant_speed:.2f} MB/s (avg: {speed:.2f}) | "
+              f"Elapsed: {elapsed:.0f}s | "
+              f"ETA: {eta:.0f}s")
+        
+        self.last_time = now
+        self.last_bytes = bytes_read
 
 def upload_file(access_token, instance_url, file_path, timeout_minutes=60):
     """
@@ -114,61 +425,37 @@ def upload_file(access_token, instance_url, file_path, timeout_minutes=60):
     print()
     
     url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
-    
     headers = {
         'Authorization': f'Bearer {access_token}'
     }
     
-    metadata = {
+    metadata_bytes = json.dumps({
         'Title': file_name,
         'PathOnClient': file_name
-    }
-    
-    last_print_time = [time.time()]
-    last_bytes = [0]
-    
-    def progress_callback(bytes_read, total_size, elapsed):
-        # Print progress every 2 seconds (reduced from 5 for better visibility)
-        if time.time() - last_print_time[0] > 2:
-            progress = (bytes_read / total_size) * 100
-            speed = (bytes_read / (1024**2)) / elapsed if elapsed > 0 else 0
-            
-            # Calculate instantaneous speed
-            bytes_since_last = bytes_read - last_bytes[0]
-            time_since_last = time.time() - last_print_time[0]
-            instant_speed = (bytes_since_last / (1024**2)) / time_since_last if time_since_last > 0 else 0
-            
-            eta = ((total_size - bytes_read) / (bytes_read / elapsed)) if bytes_read > 0 and elapsed > 0 else 0
-            
-            print(f"  Progress: {progress:.1f}% | "
-                  f"Uploaded: {bytes_read / (1024**2):.1f}/{total_size / (1024**2):.1f} MB | "
-                  f"Speed: {instant_speed:.2f} MB/s (avg: {speed:.2f}) | "
-                  f"Elapsed: {elapsed:.0f}s | "
-                  f"ETA: {eta:.0f}s")
-            
-            last_print_time[0] = time.time()
-            last_bytes[0] = bytes_read
+    }).encode()
     
     try:
         print("Uploading file...")
         print("(Progress updates every 2 seconds)\n")
         
-        start_time = time.time()
+        start_time = time.monotonic()
         
-        with FileWithProgress(file_path, progress_callback) as f:
-            files = {
-                'entity_content': (None, json.dumps(metadata), 'application/json'),
+        with open(file_path, 'rb') as f:
+            # Stream the multipart body from disk instead of building it in memory
+            encoder = MultipartEncoder(fields={
+                'entity_content': (None, metadata_bytes, 'application/json'),
                 'VersionData': (file_name, f, 'application/octet-stream')
-            }
+            })
+            monitor = MultipartEncoderMonitor(encoder, ProgressTicker(start_time))
             
-            response = requests.post(
+            response = SESSION.post(
                 url,
-                headers=headers,
-                files=files,
+                data=monitor,
+                headers={**headers, 'Content-Type': monitor.content_type},
                 timeout=timeout_minutes * 60
             )
         
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         
         print()
         print("=" * 70)
@@ -182,8 +469,8 @@ def upload_file(access_token, instance_url, file_path, timeout_minutes=60):
             
             # Verify
             print("\nVerifying upload...")
-            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}"
-            verify_response = requests.get(verify_url, headers=headers)
+            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}?fields=ContentSize"
+            verify_response = SESSION.get(verify_url, headers=headers)
             
             if verify_response.status_code == 200:
                 cv_data = verify_response.json()
@@ -194,11 +481,15 @@ def upload_file(access_token, instance_url, file_path, timeout_minutes=60):
                     print("✓ Size matches perfectly!")
                 else:
                     print(f"⚠ Size mismatch: Local={file_size:,}, Uploaded={uploaded_size:,}")
+            elif verify_response.status_code == 401:
+                clear_cached_credentials()
             
             return result['id']
         else:
             print(f"✗ Upload failed: {response.status_code}")
             print(f"Error: {response.text}")
+            if response.status_code == 401:
+                clear_cached_credentials()
             return None
             
     except requests.exceptions.Timeout:
@@ -214,21 +505,237 @@ def upload_file(access_token, instance_url, file_path, timeout_minutes=60):
         traceback.print_exc()
         return None
 
+class FilePart:
+    """Read-only view of one byte range of a file, read with os.pread so parts can share one descriptor"""
+    def __init__(self, fd, offset, length):
+        self.fd = fd
+        self.offset = offset
+        self.length = length
+        self.pos = 0
+    
+    @property
+    def len(self):
+        # Remaining bytes, which is what MultipartEncoder expects from .len
+        return self.length - self.pos
+    
+    def read(self, size=-1):
+        remaining = self.length - self.pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = os.pread(self.fd, size, self.offset + self.pos)
+        self.pos += len(data)
+        return data
+
+def delete_content_versions(instance_url, headers, content_version_ids):
+    """Delete the ContentDocuments behind the given ContentVersions; returns the IDs that could not be deleted"""
+    id_list = ",".join(f"'{content_version_id}'" for content_version_id in content_version_ids)
+    try:
+        response = SESSION.get(
+            f"{instance_url}/services/data/v59.0/query",
+            headers=headers,
+            params={'q': f"SELECT Id, ContentDocumentId FROM ContentVersion WHERE Id IN ({id_list})"}
+        )
+        if response.status_code != 200:
+            return list(content_version_ids)
+        
+        leftover_ids = []
+        for record in response.json()['records']:
+            # A ContentVersion cannot be deleted on its own, only through its ContentDocument
+            delete_response = SESSION.delete(
+                f"{instance_url}/services/data/v59.0/sobjects/ContentDocument/{record['ContentDocumentId']}",
+                headers=headers
+            )
+            if delete_response.status_code != 204:
+                leftover_ids.append(record['Id'])
+        return leftover_ids
+    except requests.exceptions.RequestException:
+        return list(content_version_ids)
+
+def upload_file_bulk_parallel(access_token, instance_url, file_path, part_size=50*1024**2, parallelism=6,
+                              timeout_minutes=60, max_attempts=3):
+    """
+    Upload file to Salesforce as parts sent in parallel, one ContentVersion per part.
+    
+    The result is N separate files in Salesforce, NOT one file: each part is its
+    own ContentVersion named <file>.part001, <file>.part002, ... and has to be
+    downloaded and concatenated in order to get the original back.
+    
+    A single POST is limited to one TCP stream; sending parts concurrently uses
+    several. Bulk API 2.0 ingest jobs only accept CSV record data for an object,
+    not file content, hence the separate records. Parts are read with os.pread
+    from one file descriptor, share the pooled SESSION, and are retried
+    individually. If a part fails for good, parts not yet started are cancelled
+    and the parts already uploaded are deleted.
+    
+    Returns the ContentVersion IDs in part order, or None if any part failed.
+    """
+    
+    file_name = os.path.basename(file_path)
+    file_size = os.path.getsize(file_path)
+    part_count = max(1, -(-file_size // part_size))
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Starting upload")
+    print(f"File: {file_name}")
+    print(f"Size: {file_size / (1024**2):.2f} MB ({file_size:,} bytes)")
+    print(f"Timeout: {timeout_minutes} minutes per part")
+    print(f"Method: {part_count} parts of {part_size / (1024**2):.0f} MB, {parallelism} in parallel")
+    print("=" * 70)
+    print()
+    
+    url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
+    headers = {
+        'Authorization': f'Bearer {access_token}'
+    }
+    
+    abort = threading.Event()  # Set once a part has failed for good
+    
+    def upload_part(fd, index):
+        offset = index * part_size
+        length = min(part_size, file_size - offset)
+        part_name = f"{file_name}.part{index + 1:03d}"
+        metadata_json = json.dumps({
+            'Title': part_name,
+            'PathOnClient': part_name
+        })
+        
+        for attempt in range(1, max_attempts + 1):
+            if abort.is_set():
+                raise RuntimeError(f"Part {index + 1} cancelled")
+            encoder = MultipartEncoder(fields={
+                'entity_content': (None, metadata_json, 'application/json'),
+                'VersionData': (part_name, FilePart(fd, offset, length), 'application/octet-stream')
+            })
+            try:
+                response = SESSION.post(
+                    url,
+                    data=encoder,
+                    headers={**headers, 'Content-Type': encoder.content_type},
+                    timeout=timeout_minutes * 60
+                )
+                if response.status_code == 201:
+                    return response.json()['id'], length
+                if response.status_code == 401:
+                    # Retrying with the same token cannot help
+                    clear_cached_credentials()
+                    raise RuntimeError(f"Part {index + 1} rejected: 401 {response.text}")
+                error = f"{response.status_code} {response.text}"
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            
+            print(f"  ⚠ Part {index + 1} attempt {attempt}/{max_attempts} failed: {error}")
+        
+        raise RuntimeError(f"Part {index + 1} failed after {max_attempts} attempts")
+    
+    try:
+        print(f"Uploading {part_count} parts...\n")
+        
+        start_time = time.monotonic()
+        part_ids = [None] * part_count
+        bytes_done = 0
+        failure = None
+        
+        with open(file_path, 'rb') as f:
+            executor = ThreadPoolExecutor(max_workers=parallelism)
+            try:
+                futures = {executor.submit(upload_part, f.fileno(), index): index for index in range(part_count)}
+                
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        part_ids[index], length = future.result()
+                    except Exception as e:
+                        failure = e
+                        break
+                    bytes_done += length
+                    elapsed = time.monotonic() - start_time
+                    print(f"  ✓ Part {index + 1}/{part_count} uploaded | "
+                          f"Uploaded: {bytes_done / (1024**2):.1f}/{file_size / (1024**2):.1f} MB | "
+                          f"Elapsed: {elapsed:.0f}s")
+            finally:
+                # Drop the parts that have not started and stop in-flight parts from retrying,
+                # then wait only for the requests already on the wire so their IDs are known
+                abort.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+        
+        if failure is not None:
+            for future, index in futures.items():
+                if part_ids[index] is None and not future.cancelled() and future.exception() is None:
+                    part_ids[index] = future.result()[0]
+            uploaded_ids = [content_version_id for content_version_id in part_ids if content_version_id]
+            
+            print()
+            print("=" * 70)
+            print(f"✗ Upload failed: {failure}")
+            if uploaded_ids:
+                print(f"Deleting {len(uploaded_ids)} part(s) that were already uploaded...")
+                leftover_ids = delete_content_versions(instance_url, headers, uploaded_ids)
+                if leftover_ids:
+                    print(f"⚠ Could not delete {len(leftover_ids)} part(s); remove these ContentVersions by hand:")
+                    for content_version_id in leftover_ids:
+                        print(f"  {content_version_id}")
+                else:
+                    print(f"✓ Deleted {len(uploaded_ids)} part(s)")
+            return None
+        
+        elapsed = time.monotonic() - start_time
+        
+        print()
+        print("=" * 70)
+        print(f"Upload completed in {elapsed:.1f} seconds ({elapsed/60:.1f} minutes)")
+        print(f"✓ Upload successful!")
+        print(f"Average speed: {(file_size / (1024**2)) / elapsed:.2f} MB/s")
+        
+        # Verify all parts with one query
+        print("\nVerifying upload...")
+        id_list = ",".join(f"'{content_version_id}'" for content_version_id in part_ids)
+        verify_response = SESSION.get(
+            f"{instance_url}/services/data/v59.0/query",
+            headers=headers,
+            params={'q': f"SELECT ContentSize FROM ContentVersion WHERE Id IN ({id_list})"}
+        )
+        
+        if verify_response.status_code == 200:
+            uploaded_size = sum(record['ContentSize'] for record in verify_response.json()['records'])
+            print(f"✓ Salesforce file size: {uploaded_size / (1024**2):.2f} MB ({uploaded_size:,} bytes) across {part_count} parts")
+            
+            if uploaded_size == file_size:
+                print("✓ Size matches perfectly!")
+            else:
+                print(f"⚠ Size mismatch: Local={file_size:,}, Uploaded={uploaded_size:,}")
+        elif verify_response.status_code == 401:
+            clear_cached_credentials()
+        
+        return part_ids
+            
+    except Exception as e:
+        print(f"\n✗ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
 if __name__ == "__main__":
     # Configuration
     FILE_PATH = "/Users/sreekanthgorla/Projects/SGDemos/scripts/test_file.tsv"
     FILE_SIZE_MB = 1000  # Change this: 100, 500, 1000, or 2000 (2GB)
     TIMEOUT_MINUTES = 120  # 2 hours for large files
+    COMPRESS_UPLOAD = False  # Set to True to upload a zstd-compressed copy (<file>.zst)
+    USE_PARALLEL_PARTS = False  # Set to True to upload as parallel parts (one ContentVersion per part)
     
     print("=" * 70)
     print("SALESFORCE FILE UPLOADER")
     print("=" * 70)
     print()
     print("IMPORTANT NOTES:")
-    print("- This script uploads files in a SINGLE request (not chunked)")
-    print("- Salesforce ContentVersion API does NOT support chunk appending")
-    print("- Maximum tested size: 2GB")
-    print("- For true chunking, use Salesforce Bulk API 2.0")
+    if USE_PARALLEL_PARTS:
+        print("- This script uploads the file as parallel parts (USE_PARALLEL_PARTS)")
+        print("- Each part becomes a SEPARATE ContentVersion, not one file")
+        print("- Salesforce does not join the parts; concatenate them in order after download")
+    else:
+        print("- This script uploads files in a SINGLE request (not chunked)")
+        print("- Salesforce ContentVersion API does NOT support chunk appending")
+        print("- Maximum tested size: 2GB")
+        print("- For true chunking, use Salesforce Bulk API 2.0")
+        print("- USE_PARALLEL_PARTS uploads parallel parts as separate ContentVersions")
     print("=" * 70)
     print()
     
@@ -239,37 +746,68 @@ if __name__ == "__main__":
         print("\n✗ Failed to get credentials. Exiting.")
         exit(1)
     
+    if COMPRESS_UPLOAD and zstd is None:
+        print("✗ COMPRESS_UPLOAD requires the zstandard package (pip install zstandard). Exiting.")
+        exit(1)
+    
+    UPLOAD_PATH = f"{FILE_PATH}.zst" if COMPRESS_UPLOAD else FILE_PATH
+    create_file = generate_compressed_file if COMPRESS_UPLOAD else generate_file
+    
     # Generate or use existing file
-    if not os.path.exists(FILE_PATH):
-        print(f"File not found. Generating {FILE_SIZE_MB}MB file...\n")
-        generate_file(FILE_PATH, size_mb=FILE_SIZE_MB)
+    if not os.path.exists(UPLOAD_PATH):
+        # Only compress an existing TSV if it was generated for the current FILE_SIZE_MB
+        if COMPRESS_UPLOAD and os.path.exists(FILE_PATH) and checksum_mismatch(FILE_PATH, FILE_SIZE_MB, False) is None:
+            compress_file(FILE_PATH, UPLOAD_PATH)
+            digest = None  # Not hashed while compressing, so write_checksum reads the .zst back
+        else:
+            print(f"File not found. Generating {FILE_SIZE_MB}MB file...\n")
+            digest = create_file(UPLOAD_PATH, size_mb=FILE_SIZE_MB)
+        write_checksum(UPLOAD_PATH, FILE_SIZE_MB, COMPRESS_UPLOAD, digest)
     else:
-        file_size = os.path.getsize(FILE_PATH)
-        print(f"Using existing file: {FILE_PATH}")
-        print(f"Size: {file_size / (1024**2):.2f} MB ({file_size:,} bytes)\n")
+        file_size = os.path.getsize(UPLOAD_PATH)
+        print(f"Using existing file: {UPLOAD_PATH}")
+        print(f"Size: {file_size / (1024**2):.2f} MB ({file_size:,} bytes)")
         
-        # Ask user to confirm
-        user_input = input("Use this file? (y/n): ")
-        if user_input.lower() != 'y':
-            print("Generating new file...\n")
-            os.remove(FILE_PATH)
-            generate_file(FILE_PATH, size_mb=FILE_SIZE_MB)
+        mismatch = checksum_mismatch(UPLOAD_PATH, FILE_SIZE_MB, COMPRESS_UPLOAD)
+        if mismatch is None:
+            print(f"✓ Matches {UPLOAD_PATH}.sha256 and the current settings (delete the file to regenerate)\n")
+        else:
+            print(f"⚠ {mismatch}\n")
+            
+            # Ask user to confirm
+            user_input = input("Use this file anyway? (y/n): ")
+            if user_input.lower() != 'y':
+                print("Generating new file...\n")
+                os.remove(UPLOAD_PATH)
+                digest = create_file(UPLOAD_PATH, size_mb=FILE_SIZE_MB)
+                write_checksum(UPLOAD_PATH, FILE_SIZE_MB, COMPRESS_UPLOAD, digest)
     
     # Upload
-    result = upload_file(
-        ACCESS_TOKEN, 
-        INSTANCE_URL, 
-        FILE_PATH,
-        timeout_minutes=TIMEOUT_MINUTES
-    )
-    
-    if result:
+    if USE_PARALLEL_PARTS:
+        results = upload_file_bulk_parallel(
+            ACCESS_TOKEN,
+            INSTANCE_URL,
+            UPLOAD_PATH,
+            timeout_minutes=TIMEOUT_MINUTES
+        ) or []
+    else:
+        result = upload_file(
+            ACCESS_TOKEN, 
+            INSTANCE_URL, 
+            UPLOAD_PATH,
+            timeout_minutes=TIMEOUT_MINUTES
+        )
+        results = [result] if result else []
+    
+    if results:
         print(f"\n{'='*70}")
         print("✓ SUCCESS!")
         print(f"{'='*70}")
-        print(f"ContentVersion ID: {result}")
+        for result in results:
+            print(f"ContentVersion ID: {result}")
         print(f"View in Salesforce:")
-        print(f"{INSTANCE_URL}/lightning/r/ContentVersion/{result}/view")
+        for result in results:
+            print(f"{INSTANCE_URL}/lightning/r/ContentVersion/{result}/view")
         print(f"{'='*70}")
     else:
         print(f"\n{'='*70}")
@@ -1,15 +1,147 @@
 import os
+import errno
 import json
+import hashlib
 from datetime import datetime
 import subprocess
+import mmap
+import socket
+import http.client
+import uuid
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+import numpy as np
 import time
-import random
-import threading
+import signal
+import asyncio
 import sys
 
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None  # Only needed when COMPRESS_UPLOAD is enabled
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # Only needed when USE_AIOHTTP is enabled
+
+UPLOAD_BLOCKSIZE = 1024 * 1024  # Bytes read from the body per socket send
+UPLOAD_SNDBUF = 4 * 1024 * 1024
+
+class UploadHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with a larger socket send buffer and body read size for big uploads"""
+    def init_poolmanager(self, *args, **kwargs):
+        # Keep urllib3's TCP_NODELAY default and let the TCP window fill on high-latency links
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, UPLOAD_SNDBUF)
+        ]
+        kwargs['blocksize'] = UPLOAD_BLOCKSIZE
+        super().init_poolmanager(*args, **kwargs)
+
+# Shared session so the upload and the verify call reuse one pooled TLS connection
+SESSION = requests.Session()
+SESSION.mount('https://', UploadHTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # raise_on_status=False: a 5xx that outlasts the retries comes back as a response, so a
+    # failed verify only skips the size check instead of failing an upload that succeeded
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False)
+))
+
+CREDENTIALS_CACHE = os.path.expanduser('~/.cache/sf_upload_token.json')
+CREDENTIALS_TTL = 3600  # Seconds before `sf org display` is asked again
+
+def current_target_org():
+    """
+    Return the sf CLI's target org (alias or username) without starting the CLI.
+    Resolved in the same order as sf: SF_TARGET_ORG, the nearest project's
+    .sf/config.json, then ~/.sf/config.json. Returns None if no default is set.
+    """
+    if os.environ.get('SF_TARGET_ORG'):
+        return os.environ['SF_TARGET_ORG']
+    
+    directory = os.getcwd()
+    config_paths = []
+    while True:
+        config_paths.append(os.path.join(directory, '.sf', 'config.json'))
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    config_paths.append(os.path.expanduser('~/.sf/config.json'))
+    
+    for config_path in config_paths:
+        try:
+            with open(config_path) as f:
+                target_org = json.load(f).get('target-org')
+        except (OSError, ValueError):
+            continue
+        if target_org:
+            return target_org
+    return None
+
+def load_cached_credentials(target_org):
+    """Return (access_token, instance_url, username) cached for target_org, or None if missing or stale"""
+    try:
+        with open(CREDENTIALS_CACHE) as f:
+            cached = json.load(f).get(target_org or '')
+    except (OSError, ValueError, AttributeError):
+        return None
+    
+    if not cached or time.time() - cached.get('ts', 0) > CREDENTIALS_TTL:
+        return None
+    if cached.get('accessToken') and cached.get('instanceUrl'):
+        return cached['accessToken'], cached['instanceUrl'], cached.get('username')
+    return None
+
+def save_cached_credentials(target_org, access_token, instance_url, username):
+    """Store the credentials for target_org in the cache file, readable only by the current user"""
+    try:
+        with open(CREDENTIALS_CACHE) as f:
+            cache = json.load(f)
+        # Keep only per-org entries, which also drops the older single-entry format
+        cache = {org: entry for org, entry in cache.items() if isinstance(entry, dict)}
+    except (OSError, ValueError, AttributeError):
+        cache = {}
+    
+    cache[target_org or ''] = {
+        'accessToken': access_token,
+        'instanceUrl': instance_url,
+        'username': username,
+        'ts': time.time()
+    }
+    
+    try:
+        os.makedirs(os.path.dirname(CREDENTIALS_CACHE), exist_ok=True)
+        fd = os.open(CREDENTIALS_CACHE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"⚠ Could not cache credentials: {e}")
+
+def clear_cached_credentials():
+    """Delete the cache file after Salesforce rejects a token, so the next run asks sf again"""
+    try:
+        os.remove(CREDENTIALS_CACHE)
+        print(f"⚠ Access token rejected; removed {CREDENTIALS_CACHE}, run again to re-authenticate")
+    except FileNotFoundError:
+        pass
+
 def get_sf_credentials():
     """Get access token and instance URL from Salesforce CLI"""
+    target_org = current_target_org()
+    cached = load_cached_credentials(target_org)
+    if cached:
+        access_token, instance_url, username = cached
+        print(f"✓ Authenticated as: {username} (cached)")
+        print(f"✓ Instance: {instance_url}\n")
+        return access_token, instance_url
+    
     print("Getting credentials from Salesforce CLI...")
     
     try:
@@ -30,6 +162,7 @@ def get_sf_credentials():
             if access_token and instance_url:
                 print(f"✓ Authenticated as: {username}")
                 print(f"✓ Instance: {instance_url}\n")
+                save_cached_credentials(target_org, access_token, instance_url, username)
                 return access_token, instance_url
         
         return None, None
@@ -38,35 +171,201 @@ def get_sf_credentials():
         print(f"✗ Error: {e}")
         return None, None
 
+BATCH_ROWS = 100_000
+
+def generate_batches(target_size):
+    """Yield (bytes, row_count) batches of test data totalling exactly target_size bytes"""
+    target_size = int(target_size)  # Whole bytes, since the last row is padded to land on it exactly
+    header = b"ID\tName\tEmail\tAge\tCity\tCountry\tDate\tScore\tStatus\tDescription\n"
+    yield header, 0
+    current_size = len(header)
+    row_count = 0
+    
+    cities = ['NYC', 'LA', 'Chicago', 'Houston', 'Phoenix']
+    countries = ['USA', 'Canada', 'UK', 'Germany']
+    statuses = ['Active', 'Inactive', 'Pending']
+    
+    # City, country, date and status all cycle with the row ID and together repeat
+    # every lcm(5, 4, 28, 3) = 420 rows, so one lookup per row covers them. Object
+    # arrays so fancy indexing hands back the same Python str objects.
+    cycle = 420
+    places = np.array([
+        f"{cities[i % 5]}\t{countries[i % 4]}\t2024-01-{i % 28 + 1:02d}" for i in range(cycle)
+    ], dtype=object)
+    status_cycle = np.array([statuses[i % 3] for i in range(cycle)], dtype=object)
+    numbers = np.array([str(n) for n in range(101)], dtype=object)  # Ages and scores, pre-formatted
+    rng = np.random.default_rng()
+    
+    # Build rows a batch at a time; columns come from NumPy, not per-row Python calls.
+    # Every column is already a str, so the f-string below only concatenates.
+    while current_size < target_size:
+        ids = np.arange(row_count + 1, row_count + BATCH_ROWS + 1)
+        phase = ids % cycle
+        columns = zip(
+            map(str, ids.tolist()),
+            numbers[rng.integers(18, 81, BATCH_ROWS)].tolist(),
+            places[phase].tolist(),
+            numbers[rng.integers(0, 101, BATCH_ROWS)].tolist(),
+            status_cycle[phase].tolist()
+        )
+        rows = [
+            f"{i}\tUser{i}\tuser{i}@test.com\t{age}\t{place}\t{score}\t{status}\tDescription text data here for row {i}\n"
+            for i, age, place, score, status in columns
+        ]
+        
+        # Last batch: keep the rows that leave at least `reserve` bytes (more than any
+        # one row), then pad the next row's description so the total is exactly
+        # target_size; the size is then known before anything is generated.
+        # Row boundaries are only needed for that batch, so the others skip them.
+        remaining = target_size - current_size
+        reserve = 256
+        text = "".join(rows)
+        if len(text) > remaining - reserve:
+            row_ends = np.cumsum(np.fromiter(map(len, rows), dtype=np.int64, count=len(rows)))
+            keep = int(np.searchsorted(row_ends, remaining - reserve, side='right'))
+            rows = rows[:keep + 1]
+            used = int(row_ends[keep - 1]) if keep else 0
+            rows[-1] = rows[-1][:-1] + " " * (remaining - used - len(rows[-1])) + "\n"
+            text = "".join(rows)
+        
+        batch = text.encode('ascii')
+        current_size += len(batch)
+        row_count += len(rows)
+        yield batch, len(rows)
+
 def generate_file(filename, size_mb):
-    """Generate test file of specified size"""
-    target_size = size_mb * 1024 * 1024
-    current_size = 0
+    """Generate test file of specified size; returns the file's SHA-256 hex digest"""
+    target_size = int(size_mb * 1024 * 1024)  # size_mb may be fractional, e.g. 0.5 for a quick run
+    digest = hashlib.sha256()  # Hashed as it is written, so the sidecar needs no second read
+    pos = 0
     row_count = 0
     
     print(f"Generating {size_mb}MB test file: {filename}")
     
-    with open(filename, 'w', buffering=8192*1024) as f:
-        header = "ID\tName\tEmail\tAge\tCity\tCountry\tDate\tScore\tStatus\tDescription\n"
-        f.write(header)
-        current_size += len(header)
-        
-        cities = ['NYC', 'LA', 'Chicago', 'Houston', 'Phoenix']
-        countries = ['USA', 'Canada', 'UK', 'Germany']
-        statuses = ['Active', 'Inactive', 'Pending']
+    # Write batches straight into a mapping of the file sized to exactly what generate_batches yields
+    fd = os.open(filename, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            os.posix_fallocate(fd, 0, target_size)
+        except AttributeError:
+            os.ftruncate(fd, target_size)  # No posix_fallocate on macOS
+        except OSError as e:
+            # Only fall back when the filesystem cannot preallocate. Anything else, such as
+            # ENOSPC, must fail here: writes into a sparse mapping on a full disk die with SIGBUS
+            if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                os.remove(filename)
+                raise
+            os.ftruncate(fd, target_size)
         
-        while current_size < target_size:
-            row_count += 1
-            row = f"{row_count}\tUser{row_count}\tuser{row_count}@test.com\t{random.randint(18,80)}\t{cities[row_count%5]}\t{countries[row_count%4]}\t2024-01-{(row_count%28)+1:02d}\t{random.randint(0,100)}\t{statuses[row_count%3]}\tDescription text data here for row {row_count}\n"
-            f.write(row)
-            current_size += len(row)
+        with mmap.mmap(fd, target_size) as mm:
+            for batch, batch_rows in generate_batches(target_size):
+                mm[pos:pos + len(batch)] = batch
+                digest.update(batch)
+                pos += len(batch)
+                row_count += batch_rows
+                
+                if batch_rows and row_count % 500000 == 0:
+                    print(f"  Progress: {pos / (1024**2):.2f} MB ({row_count:,} rows)")
+    finally:
+        os.close(fd)
+    
+    actual_size = os.path.getsize(filename)
+    print(f"✓ Generated {actual_size / (1024**2):.2f} MB with {row_count:,} rows\n")
+    return digest.hexdigest()
+
+class HashingWriter:
+    """Write-through file wrapper that hashes every byte written to the underlying file"""
+    def __init__(self, file, digest):
+        self.file = file
+        self.digest = digest
+    
+    def write(self, data):
+        self.digest.update(data)
+        return self.file.write(data)
+    
+    def flush(self):
+        self.file.flush()
+
+def generate_compressed_file(filename, size_mb, level=3):
+    """Generate test file of specified (uncompressed) size straight into a zstd stream; returns the .zst file's SHA-256 hex digest"""
+    target_size = int(size_mb * 1024 * 1024)
+    current_size = 0
+    row_count = 0
+    
+    print(f"Generating {size_mb}MB test file (zstd level {level}): {filename}")
+    
+    # The uncompressed TSV never touches disk; batches go straight into the compressor
+    cctx = zstd.ZstdCompressor(level=level, threads=-1)
+    # The sidecar describes the .zst on disk, so the compressed output is what gets hashed
+    digest = hashlib.sha256()
+    with open(filename, 'wb') as raw, cctx.stream_writer(HashingWriter(raw, digest), closefd=False) as f:
+        for batch, batch_rows in generate_batches(target_size):
+            f.write(batch)
+            current_size += len(batch)
+            row_count += batch_rows
             
-            if row_count % 500000 == 0:
+            if batch_rows and row_count % 500000 == 0:
                 print(f"  Progress: {current_size / (1024**2):.2f} MB ({row_count:,} rows)")
     
     actual_size = os.path.getsize(filename)
-    print(f"✓ Generated {actual_size / (1024**2):.2f} MB with {row_count:,} rows\n")
-    return row_count
+    print(f"✓ Generated {current_size / (1024**2):.2f} MB with {row_count:,} rows "
+          f"({actual_size / (1024**2):.2f} MB compressed)\n")
+    return digest.hexdigest()
+
+def compress_file(src_path, dst_path, level=3):
+    """Compress an existing file with zstd for upload"""
+    print(f"Compressing {src_path} (zstd level {level})...")
+    
+    cctx = zstd.ZstdCompressor(level=level, threads=-1)
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        cctx.copy_stream(src, dst, read_size=1 << 20, write_size=1 << 20)
+    
+    src_size = os.path.getsize(src_path)
+    dst_size = os.path.getsize(dst_path)
+    print(f"✓ Compressed {src_size / (1024**2):.2f} MB to {dst_size / (1024**2):.2f} MB "
+          f"({src_size / dst_size:.1f}x)\n")
+
+def file_sha256(file_path):
+    """SHA-256 of a file, read in 1 MiB blocks (OpenSSL uses the CPU's SHA instructions when present)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_checksum(file_path, size_mb, compressed, digest=None):
+    """
+    Record the file's SHA-256, size and the settings it was generated with in a <file>.sha256 sidecar.
+    Pass the digest when it was computed while writing; otherwise the file is read back and hashed.
+    """
+    with open(f"{file_path}.sha256", 'w') as f:
+        json.dump({
+            'sha256': digest or file_sha256(file_path),
+            'size': os.path.getsize(file_path),
+            'size_mb': size_mb,
+            'compressed': compressed
+        }, f)
+
+def checksum_mismatch(file_path, size_mb, compressed):
+    """
+    Check the file against its <file>.sha256 sidecar and the current settings.
+    Returns None if the file can be reused as is, otherwise the reason it cannot.
+    The settings and size are compared before the file is hashed.
+    """
+    try:
+        with open(f"{file_path}.sha256") as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return f"No {file_path}.sha256 sidecar from a previous run"
+    
+    if recorded.get('size_mb') != size_mb or recorded.get('compressed') != compressed:
+        return (f"File was generated with FILE_SIZE_MB={recorded.get('size_mb')}, compressed={recorded.get('compressed')}; "
+                f"current settings are FILE_SIZE_MB={size_mb}, compressed={compressed}")
+    if recorded.get('size') != os.path.getsize(file_path):
+        return f"File size no longer matches {file_path}.sha256"
+    if file_sha256(file_path) != recorded.get('sha256'):
+        return f"SHA-256 no longer matches {file_path}.sha256 (the file changed after it was generated)"
+    return None
 
 def upload_file_with_curl_progress(instance_url, access_token, file_path, timeout_minutes=120):
     """
@@ -86,11 +385,10 @@ def upload_file_with_curl_progress(instance_url, access_token, file_path, timeou
     print()
     
     try:
-        # Create a temporary file for the response
+        # Temporary file that receives curl's stdout: the response body, then the -w status code
         import tempfile
         response_file = tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json')
         response_file_path = response_file.name
-        response_file.close()
         
         url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
         
@@ -99,7 +397,7 @@ def upload_file_with_curl_progress(instance_url, access_token, file_path, timeou
             'PathOnClient': file_name
         })
         
-        # Build curl command - output response to file, progress to stderr (terminal)
+        # Build curl command - response and status code to stdout (the file), progress to stderr (terminal)
         curl_cmd = [
             'curl',
             '-X', 'POST',
@@ -110,35 +408,34 @@ def upload_file_with_curl_progress(instance_url, access_token, file_path, timeou
             '-F', f'VersionData=@{file_path}',
             '--max-time', str(timeout_minutes * 60),
             '-w', '\n%{http_code}',
-            '--progress-bar',  # Show progress bar on stderr
-            '-o', response_file_path  # Output response to file instead of stdout
+            '--progress-bar'  # Show progress bar on stderr
         ]
         
         print("Uploading file...\n")
         start_time = time.time()
         
-        # Run curl without capturing stderr so progress bar shows in terminal
-        result = subprocess.run(
-            curl_cmd,
-            stderr=sys.stderr,  # Let stderr (progress) go directly to terminal
-            stdout=subprocess.PIPE,
-            text=True,
-            check=False
-        )
-        
-        elapsed = time.time() - start_time
-        
-        # Read response from file
-        with open(response_file_path, 'r') as f:
-            output = f.read()
+        # Run curl without capturing stderr so progress bar shows in terminal;
+        # stdout goes straight to the response file, so no pipe is held open
+        with response_file:
+            result = subprocess.run(
+                curl_cmd,
+                stderr=sys.stderr,  # Let stderr (progress) go directly to terminal
+                stdout=response_file,
+                check=False
+            )
+            
+            elapsed = time.time() - start_time
+            
+            # Read response from file
+            response_file.seek(0)
+            output = response_file.read()
         
         # Clean up temp file
         os.unlink(response_file_path)
         
-        # Parse response
-        lines = output.strip().split('\n')
-        http_code = lines[-1] if lines else '000'
-        response_body = '\n'.join(lines[:-1]) if len(lines) > 1 else ''
+        # Parse response: the body, then the status code on the last line
+        response_body, _, http_code = output.strip().rpartition('\n')
+        http_code = http_code or '000'
         
         print()
         print("=" * 70)
@@ -159,7 +456,7 @@ def upload_file_with_curl_progress(instance_url, access_token, file_path, timeou
                 verify_cmd = [
                     'curl',
                     '-X', 'GET',
-                    f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{content_version_id}",
+                    f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{content_version_id}?fields=ContentSize",
                     '-H', f'Authorization: Bearer {access_token}',
                     '-H', 'Content-Type: application/json',
                     '-s'
@@ -185,6 +482,8 @@ def upload_file_with_curl_progress(instance_url, access_token, file_path, timeou
         else:
             print(f"✗ Upload failed")
             print(f"Response: {response_body}")
+            if http_code == '401':
+                clear_cached_credentials()
             return None
             
     except Exception as e:
@@ -193,36 +492,87 @@ def upload_file_with_curl_progress(instance_url, access_token, file_path, timeou
         traceback.print_exc()
         return None
 
-class ProgressMonitor:
-    """Monitor upload progress in a separate thread"""
-    def __init__(self, file_path):
-        self.file_path = file_path
-        self.file_size = os.path.getsize(file_path)
-        self.start_time = time.time()
-        self.stop_flag = threading.Event()
-        
-    def monitor_progress(self):
-        """Run in separate thread to show heartbeat"""
-        while not self.stop_flag.is_set():
-            try:
-                elapsed = time.time() - self.start_time
-                # Show elapsed time and estimated progress
-                print(f"  Upload in progress... Elapsed: {elapsed:.0f}s ({elapsed/60:.1f} min)")
-                time.sleep(5)  # Update every 5 seconds
-                
-            except Exception:
-                break
+def multipart_framing(metadata, file_name):
+    """
+    Build the ContentVersion multipart framing once, up front.
     
-    def start(self):
-        """Start monitoring thread"""
-        self.thread = threading.Thread(target=self.monitor_progress, daemon=True)
-        self.thread.start()
+    The REST API only creates a ContentVersion from a multipart body (VersionData
+    cannot be sent raw or patched in later), so the boundary, metadata part and
+    closing boundary are prepared as bytes and only the file itself is streamed.
+    Returns (content_type, prologue, epilogue).
+    """
+    boundary = uuid.uuid4().hex
+    
+    prologue = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="entity_content"\r\n'
+        "Content-Type: application/json\r\n\r\n"
+        f"{json.dumps(metadata)}\r\n"
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="VersionData"; filename="{file_name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    epilogue = f"\r\n--{boundary}--\r\n".encode()
+    
+    return f"multipart/form-data; boundary={boundary}", prologue, epilogue
+
+class MultipartFileBody:
+    """Request body that returns the prologue, then the file's own reads, then the epilogue"""
+    def __init__(self, prologue, file, file_size, epilogue):
+        self.prologue = prologue
+        self.file = file
+        self.epilogue = epilogue
+        self.len = len(prologue) + file_size + len(epilogue)  # requests sends this as Content-Length
+    
+    def read(self, size=-1):
+        if self.prologue:
+            data, self.prologue = self.prologue, b''
+            return data
+        
+        data = self.file.read(size)
+        if not data:
+            data, self.epilogue = self.epilogue, b''
+        return data
+
+class IterableReader:
+    """File-like object whose read() returns the next chunk of an iterator of bytes, then b'' once it is exhausted"""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
     
-    def stop(self):
-        """Stop monitoring thread"""
-        self.stop_flag.set()
-        if hasattr(self, 'thread'):
-            self.thread.join(timeout=1)
+    def read(self, size=-1):
+        return next(self.chunks, b'')
+
+def post_multipart_sendfile(instance_url, access_token, file_path, metadata, timeout):
+    """
+    POST the ContentVersion multipart body over plain HTTP, sending the file with sendfile.
+    
+    Only the small multipart prologue and epilogue pass through Python; the kernel
+    copies the file straight to the socket. Python's ssl module always falls back
+    to send() for TLS sockets, so this is only used for http:// instance URLs
+    (e.g. a local TLS-terminating proxy). Returns (status_code, response_text).
+    """
+    file_size = os.path.getsize(file_path)
+    content_type, prologue, epilogue = multipart_framing(metadata, os.path.basename(file_path))
+    
+    parts = urlsplit(instance_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    
+    try:
+        conn.putrequest('POST', f"{parts.path.rstrip('/')}/services/data/v59.0/sobjects/ContentVersion")
+        conn.putheader('Authorization', f'Bearer {access_token}')
+        conn.putheader('Content-Type', content_type)
+        conn.putheader('Content-Length', str(len(prologue) + file_size + len(epilogue)))
+        conn.endheaders()
+        
+        conn.send(prologue)
+        with open(file_path, 'rb') as f:
+            conn.sock.sendfile(f)  # os.sendfile on plain sockets
+        conn.send(epilogue)
+        
+        response = conn.getresponse()
+        return response.status, response.read().decode()
+    finally:
+        conn.close()
 
 def upload_file_requests_with_heartbeat(access_token, instance_url, file_path, timeout_minutes=120):
     """
@@ -242,7 +592,6 @@ def upload_file_requests_with_heartbeat(access_token, instance_url, file_path, t
     print()
     
     url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
-    
     headers = {
         'Authorization': f'Bearer {access_token}'
     }
@@ -255,33 +604,156 @@ def upload_file_requests_with_heartbeat(access_token, instance_url, file_path, t
     try:
         print("Uploading file (progress updates every 5 seconds)...\n")
         
-        # Start progress monitor
-        monitor = ProgressMonitor(file_path)
-        monitor.start()
+        start_time = time.monotonic()
         
-        start_time = time.time()
+        def heartbeat(signum, frame):
+            elapsed = time.monotonic() - start_time
+            print(f"  Upload in progress... Elapsed: {elapsed:.0f}s ({elapsed/60:.1f} min)")
         
-        with open(file_path, 'rb') as f:
-            files = {
-                'entity_content': (None, json.dumps(metadata), 'application/json'),
-                'VersionData': (file_name, f, 'application/octet-stream')
-            }
+        # Heartbeat every 5 seconds from an interval timer rather than a monitor thread.
+        # SIGALRM is POSIX-only and must be installed from the main thread.
+        previous_handler = signal.signal(signal.SIGALRM, heartbeat)
+        signal.setitimer(signal.ITIMER_REAL, 5, 5)
+        
+        try:
+            if urlsplit(instance_url).scheme == 'http':
+                # No TLS in Python, so the file body can go to the socket without userspace copies
+                status_code, response_text = post_multipart_sendfile(
+                    instance_url, access_token, file_path, metadata, timeout_minutes * 60
+                )
+            else:
+                content_type, prologue, epilogue = multipart_framing(metadata, file_name)
+                
+                with open(file_path, 'rb') as f:
+                    # Stream the file between the pre-built framing instead of building the body in memory
+                    response = SESSION.post(
+                        url,
+                        data=MultipartFileBody(prologue, f, file_size, epilogue),
+                        headers={**headers, 'Content-Type': content_type},
+                        timeout=timeout_minutes * 60
+                    )
+                status_code, response_text = response.status_code, response.text
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        
+        elapsed = time.monotonic() - start_time
+        
+        print()
+        print("=" * 70)
+        print(f"Upload completed in {elapsed:.1f} seconds ({elapsed/60:.1f} minutes)")
+        
+        if status_code == 201:
+            result = json.loads(response_text)
+            print(f"✓ Upload successful!")
+            print(f"ContentVersion ID: {result['id']}")
+            print(f"Average speed: {(file_size / (1024**2)) / elapsed:.2f} MB/s")
+            
+            # Verify
+            print("\nVerifying upload...")
+            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}?fields=ContentSize"
+            verify_response = SESSION.get(verify_url, headers=headers)
+            
+            if verify_response.status_code == 200:
+                cv_data = verify_response.json()
+                uploaded_size = cv_data.get('ContentSize', 0)
+                print(f"✓ Salesforce file size: {uploaded_size / (1024**2):.2f} MB ({uploaded_size:,} bytes)")
+                
+                if uploaded_size == file_size:
+                    print("✓ Size matches perfectly!")
+                else:
+                    print(f"⚠ Size mismatch: Local={file_size:,}, Uploaded={uploaded_size:,}")
+            elif verify_response.status_code == 401:
+                clear_cached_credentials()
             
-            response = requests.post(
+            return result['id']
+        else:
+            print(f"✗ Upload failed: {status_code}")
+            print(f"Error: {response_text}")
+            if status_code == 401:
+                clear_cached_credentials()
+            return None
+            
+    except (requests.exceptions.Timeout, socket.timeout):
+        print(f"\n✗ Upload timed out after {timeout_minutes} minutes")
+        return None
+    except (requests.exceptions.ConnectionError, ConnectionError) as e:
+        print(f"\n✗ Connection error: {e}")
+        return None
+    except Exception as e:
+        print(f"\n✗ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def upload_generated_file(access_token, instance_url, file_name, size_mb, timeout_minutes=120):
+    """
+    Generate the test data while uploading it, so the file is never written to disk.
+    generate_batches produces exactly size_mb MB, so the body is sent with a
+    Content-Length like a file upload rather than with chunked transfer encoding.
+    """
+    
+    file_size = int(size_mb * 1024 * 1024)  # Sent as Content-Length, so it must be a whole byte count
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Starting upload")
+    print(f"File: {file_name}")
+    print(f"Size: {file_size / (1024**2):.2f} MB ({file_size:,} bytes, generated during upload)")
+    print(f"Timeout: {timeout_minutes} minutes")
+    print(f"Method: Single multipart upload, streamed from the generator")
+    print("=" * 70)
+    print()
+    
+    url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
+    headers = {
+        'Authorization': f'Bearer {access_token}'
+    }
+    
+    metadata = {
+        'Title': file_name,
+        'PathOnClient': file_name
+    }
+    
+    content_type, prologue, epilogue = multipart_framing(metadata, file_name)
+    generated = 0
+    row_count = 0
+    
+    def batches():
+        nonlocal generated, row_count
+        for batch, batch_rows in generate_batches(file_size):
+            generated += len(batch)
+            row_count += batch_rows
+            yield batch
+    
+    try:
+        print("Uploading file (progress updates every 5 seconds)...\n")
+        
+        start_time = time.monotonic()
+        
+        def heartbeat(signum, frame):
+            elapsed = time.monotonic() - start_time
+            print(f"  Upload in progress... Generated: {generated / (1024**2):.1f} MB | "
+                  f"Elapsed: {elapsed:.0f}s ({elapsed/60:.1f} min)")
+        
+        previous_handler = signal.signal(signal.SIGALRM, heartbeat)
+        signal.setitimer(signal.ITIMER_REAL, 5, 5)
+        
+        try:
+            response = SESSION.post(
                 url,
-                headers=headers,
-                files=files,
+                data=MultipartFileBody(prologue, IterableReader(batches()), file_size, epilogue),
+                headers={**headers, 'Content-Type': content_type},
                 timeout=timeout_minutes * 60
             )
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
         
-        # Stop monitor
-        monitor.stop()
-        
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         
         print()
         print("=" * 70)
         print(f"Upload completed in {elapsed:.1f} seconds ({elapsed/60:.1f} minutes)")
+        print(f"Generated {generated / (1024**2):.2f} MB with {row_count:,} rows")
         
         if response.status_code == 201:
             result = response.json()
@@ -291,8 +763,8 @@ def upload_file_requests_with_heartbeat(access_token, instance_url, file_path, t
             
             # Verify
             print("\nVerifying upload...")
-            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}"
-            verify_response = requests.get(verify_url, headers=headers)
+            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}?fields=ContentSize"
+            verify_response = SESSION.get(verify_url, headers=headers)
             
             if verify_response.status_code == 200:
                 cv_data = verify_response.json()
@@ -302,35 +774,276 @@ def upload_file_requests_with_heartbeat(access_token, instance_url, file_path, t
                 if uploaded_size == file_size:
                     print("✓ Size matches perfectly!")
                 else:
-                    print(f"⚠ Size mismatch: Local={file_size:,}, Uploaded={uploaded_size:,}")
+                    print(f"⚠ Size mismatch: Generated={file_size:,}, Uploaded={uploaded_size:,}")
+            elif verify_response.status_code == 401:
+                clear_cached_credentials()
             
             return result['id']
         else:
             print(f"✗ Upload failed: {response.status_code}")
             print(f"Error: {response.text}")
+            if response.status_code == 401:
+                clear_cached_credentials()
             return None
             
     except requests.exceptions.Timeout:
-        monitor.stop()
         print(f"\n✗ Upload timed out after {timeout_minutes} minutes")
         return None
     except requests.exceptions.ConnectionError as e:
-        monitor.stop()
         print(f"\n✗ Connection error: {e}")
         return None
     except Exception as e:
-        monitor.stop()
         print(f"\n✗ Error: {str(e)}")
         import traceback
         traceback.print_exc()
         return None
 
+async def upload_async(session, instance_url, file_path, timeout_minutes=120):
+    """
+    Upload using an aiohttp session, with a heartbeat task running alongside.
+    The file is streamed from disk and the verify call reuses the session's connection.
+    """
+    
+    file_name = os.path.basename(file_path)
+    file_size = os.path.getsize(file_path)
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Starting upload")
+    print(f"File: {file_name}")
+    print(f"Size: {file_size / (1024**2):.2f} MB ({file_size:,} bytes)")
+    print(f"Timeout: {timeout_minutes} minutes")
+    print(f"Method: Single multipart upload via aiohttp")
+    print("=" * 70)
+    print()
+    
+    url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
+    
+    metadata = {
+        'Title': file_name,
+        'PathOnClient': file_name
+    }
+    
+    try:
+        print("Uploading file (progress updates every 5 seconds)...\n")
+        
+        start_time = time.monotonic()
+        
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(5)
+                elapsed = time.monotonic() - start_time
+                print(f"  Upload in progress... Elapsed: {elapsed:.0f}s ({elapsed/60:.1f} min)")
+        
+        # The heartbeat shares the event loop with the upload instead of needing a thread or signal
+        heartbeat_task = asyncio.create_task(heartbeat())
+        
+        try:
+            with open(file_path, 'rb') as f:
+                data = aiohttp.FormData()
+                data.add_field('entity_content', json.dumps(metadata), content_type='application/json')
+                data.add_field('VersionData', f, filename=file_name, content_type='application/octet-stream')
+                
+                async with session.post(
+                    url,
+                    data=data,
+                    timeout=aiohttp.ClientTimeout(total=timeout_minutes * 60)
+                ) as response:
+                    status_code = response.status
+                    response_text = await response.text()
+        finally:
+            heartbeat_task.cancel()
+        
+        elapsed = time.monotonic() - start_time
+        
+        print()
+        print("=" * 70)
+        print(f"Upload completed in {elapsed:.1f} seconds ({elapsed/60:.1f} minutes)")
+        
+        if status_code == 201:
+            result = json.loads(response_text)
+            print(f"✓ Upload successful!")
+            print(f"ContentVersion ID: {result['id']}")
+            print(f"Average speed: {(file_size / (1024**2)) / elapsed:.2f} MB/s")
+            
+            # Verify
+            print("\nVerifying upload...")
+            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}?fields=ContentSize"
+            
+            async with session.get(verify_url) as verify_response:
+                if verify_response.status == 200:
+                    cv_data = await verify_response.json()
+                    uploaded_size = cv_data.get('ContentSize', 0)
+                    print(f"✓ Salesforce file size: {uploaded_size / (1024**2):.2f} MB ({uploaded_size:,} bytes)")
+                    
+                    if uploaded_size == file_size:
+                        print("✓ Size matches perfectly!")
+                    else:
+                        print(f"⚠ Size mismatch: Local={file_size:,}, Uploaded={uploaded_size:,}")
+                elif verify_response.status == 401:
+                    clear_cached_credentials()
+            
+            return result['id']
+        else:
+            print(f"✗ Upload failed: {status_code}")
+            print(f"Error: {response_text}")
+            if status_code == 401:
+                clear_cached_credentials()
+            return None
+            
+    except asyncio.TimeoutError:
+        print(f"\n✗ Upload timed out after {timeout_minutes} minutes")
+        return None
+    except aiohttp.ClientConnectionError as e:
+        print(f"\n✗ Connection error: {e}")
+        return None
+    except Exception as e:
+        print(f"\n✗ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def upload_file_aiohttp(access_token, instance_url, file_path, timeout_minutes=120):
+    """Run upload_async in its own event loop with an authorized, keep-alive aiohttp session"""
+    
+    async def run():
+        async with aiohttp.ClientSession(headers={'Authorization': f'Bearer {access_token}'}) as session:
+            return await upload_async(session, instance_url, file_path, timeout_minutes)
+    
+    return asyncio.run(run())
+
+async def upload_generated_async(session, instance_url, file_name, size_mb, timeout_minutes=120):
+    """
+    Generate the test data while uploading it through an aiohttp session, so the file is never written to disk.
+    The body is sent with a fixed Content-Length, as in upload_generated_file.
+    """
+    
+    file_size = int(size_mb * 1024 * 1024)  # Sent as Content-Length, so it must be a whole byte count
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Starting upload")
+    print(f"File: {file_name}")
+    print(f"Size: {file_size / (1024**2):.2f} MB ({file_size:,} bytes, generated during upload)")
+    print(f"Timeout: {timeout_minutes} minutes")
+    print(f"Method: Single multipart upload via aiohttp, streamed from the generator")
+    print("=" * 70)
+    print()
+    
+    url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion"
+    
+    metadata = {
+        'Title': file_name,
+        'PathOnClient': file_name
+    }
+    
+    content_type, prologue, epilogue = multipart_framing(metadata, file_name)
+    generated = 0
+    row_count = 0
+    
+    async def body():
+        nonlocal generated, row_count
+        yield prologue
+        for batch, batch_rows in generate_batches(file_size):
+            generated += len(batch)
+            row_count += batch_rows
+            yield batch  # aiohttp drains the socket here, which lets the heartbeat run
+        yield epilogue
+    
+    try:
+        print("Uploading file (progress updates every 5 seconds)...\n")
+        
+        start_time = time.monotonic()
+        
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(5)
+                elapsed = time.monotonic() - start_time
+                print(f"  Upload in progress... Generated: {generated / (1024**2):.1f} MB | "
+                      f"Elapsed: {elapsed:.0f}s ({elapsed/60:.1f} min)")
+        
+        heartbeat_task = asyncio.create_task(heartbeat())
+        
+        try:
+            # An explicit Content-Length keeps aiohttp from sending the async generator chunked
+            async with session.post(
+                url,
+                data=body(),
+                headers={
+                    'Content-Type': content_type,
+                    'Content-Length': str(len(prologue) + file_size + len(epilogue))
+                },
+                timeout=aiohttp.ClientTimeout(total=timeout_minutes * 60)
+            ) as response:
+                status_code = response.status
+                response_text = await response.text()
+        finally:
+            heartbeat_task.cancel()
+        
+        elapsed = time.monotonic() - start_time
+        
+        print()
+        print("=" * 70)
+        print(f"Upload completed in {elapsed:.1f} seconds ({elapsed/60:.1f} minutes)")
+        print(f"Generated {generated / (1024**2):.2f} MB with {row_count:,} rows")
+        
+        if status_code == 201:
+            result = json.loads(response_text)
+            print(f"✓ Upload successful!")
+            print(f"ContentVersion ID: {result['id']}")
+            print(f"Average speed: {(file_size / (1024**2)) / elapsed:.2f} MB/s")
+            
+            # Verify
+            print("\nVerifying upload...")
+            verify_url = f"{instance_url}/services/data/v59.0/sobjects/ContentVersion/{result['id']}?fields=ContentSize"
+            
+            async with session.get(verify_url) as verify_response:
+                if verify_response.status == 200:
+                    cv_data = await verify_response.json()
+                    uploaded_size = cv_data.get('ContentSize', 0)
+                    print(f"✓ Salesforce file size: {uploaded_size / (1024**2):.2f} MB ({uploaded_size:,} bytes)")
+                    
+                    if uploaded_size == file_size:
+                        print("✓ Size matches perfectly!")
+                    else:
+                        print(f"⚠ Size mismatch: Generated={file_size:,}, Uploaded={uploaded_size:,}")
+                elif verify_response.status == 401:
+                    clear_cached_credentials()
+            
+            return result['id']
+        else:
+            print(f"✗ Upload failed: {status_code}")
+            print(f"Error: {response_text}")
+            if status_code == 401:
+                clear_cached_credentials()
+            return None
+            
+    except asyncio.TimeoutError:
+        print(f"\n✗ Upload timed out after {timeout_minutes} minutes")
+        return None
+    except aiohttp.ClientConnectionError as e:
+        print(f"\n✗ Connection error: {e}")
+        return None
+    except Exception as e:
+        print(f"\n✗ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def upload_generated_file_aiohttp(access_token, instance_url, file_name, size_mb, timeout_minutes=120):
+    """Run upload_generated_async in its own event loop with an authorized, keep-alive aiohttp session"""
+    
+    async def run():
+        async with aiohttp.ClientSession(headers={'Authorization': f'Bearer {access_token}'}) as session:
+            return await upload_generated_async(session, instance_url, file_name, size_mb, timeout_minutes)
+    
+    return asyncio.run(run())
+
 if __name__ == "__main__":
     # Configuration
     FILE_PATH = "/Users/sreekanthgorla/Projects/SGDemos/scripts/test_file.tsv"
     FILE_SIZE_MB = 1000
     TIMEOUT_MINUTES = 120
+    COMPRESS_UPLOAD = False  # Set to True to upload a zstd-compressed copy (<file>.zst)
     USE_CURL = True  # Set to False to use requests library
+    USE_AIOHTTP = False  # Set to True to use aiohttp instead (takes precedence over USE_CURL)
+    STREAM_GENERATED = False  # Set to True to generate the data during the upload, with no file on disk (requests, or aiohttp with USE_AIOHTTP)
     
     print("=" * 70)
     print("SALESFORCE FILE UPLOADER (OPTIMIZED FOR SPEED)")
@@ -344,28 +1057,68 @@ if __name__ == "__main__":
         print("\n✗ Failed to get credentials. Exiting.")
         exit(1)
     
+    if USE_AIOHTTP and aiohttp is None:
+        print("✗ USE_AIOHTTP requires the aiohttp package (pip install aiohttp). Exiting.")
+        exit(1)
+    
+    if COMPRESS_UPLOAD and zstd is None:
+        print("✗ COMPRESS_UPLOAD requires the zstandard package (pip install zstandard). Exiting.")
+        exit(1)
+    
+    if STREAM_GENERATED and COMPRESS_UPLOAD:
+        # The compressed size is not known before generation, so it cannot be sent with a Content-Length
+        print("✗ STREAM_GENERATED uploads uncompressed data; turn off COMPRESS_UPLOAD to use it. Exiting.")
+        exit(1)
+    
+    UPLOAD_PATH = f"{FILE_PATH}.zst" if COMPRESS_UPLOAD else FILE_PATH
+    create_file = generate_compressed_file if COMPRESS_UPLOAD else generate_file
+    
     # Generate or use existing file
-    if not os.path.exists(FILE_PATH):
-        print(f"File not found. Generating {FILE_SIZE_MB}MB file...\n")
-        generate_file(FILE_PATH, size_mb=FILE_SIZE_MB)
+    if STREAM_GENERATED:
+        print(f"Streaming {FILE_SIZE_MB}MB of generated data, nothing is written to disk\n")
+    elif not os.path.exists(UPLOAD_PATH):
+        # Only compress an existing TSV if it was generated for the current FILE_SIZE_MB
+        if COMPRESS_UPLOAD and os.path.exists(FILE_PATH) and checksum_mismatch(FILE_PATH, FILE_SIZE_MB, False) is None:
+            compress_file(FILE_PATH, UPLOAD_PATH)
+            digest = None  # Not hashed while compressing, so write_checksum reads the .zst back
+        else:
+            print(f"File not found. Generating {FILE_SIZE_MB}MB file...\n")
+            digest = create_file(UPLOAD_PATH, size_mb=FILE_SIZE_MB)
+        write_checksum(UPLOAD_PATH, FILE_SIZE_MB, COMPRESS_UPLOAD, digest)
     else:
-        file_size = os.path.getsize(FILE_PATH)
-        print(f"Using existing file: {FILE_PATH}")
-        print(f"Size: {file_size / (1024**2):.2f} MB\n")
+        file_size = os.path.getsize(UPLOAD_PATH)
+        print(f"Using existing file: {UPLOAD_PATH}")
+        print(f"Size: {file_size / (1024**2):.2f} MB")
         
-        user_input = input("Use this file? (y/n): ")
-        if user_input.lower() != 'y':
-            print("Generating new file...\n")
-            os.remove(FILE_PATH)
-            generate_file(FILE_PATH, size_mb=FILE_SIZE_MB)
+        mismatch = checksum_mismatch(UPLOAD_PATH, FILE_SIZE_MB, COMPRESS_UPLOAD)
+        if mismatch is None:
+            print(f"✓ Matches {UPLOAD_PATH}.sha256 and the current settings (delete the file to regenerate)\n")
+        else:
+            print(f"⚠ {mismatch}\n")
+            
+            user_input = input("Use this file anyway? (y/n): ")
+            if user_input.lower() != 'y':
+                print("Generating new file...\n")
+                os.remove(UPLOAD_PATH)
+                digest = create_file(UPLOAD_PATH, size_mb=FILE_SIZE_MB)
+                write_checksum(UPLOAD_PATH, FILE_SIZE_MB, COMPRESS_UPLOAD, digest)
     
     # Upload
-    if USE_CURL:
+    if STREAM_GENERATED and USE_AIOHTTP:
+        print("Using aiohttp (generator streamed as the request body)\n")
+        result = upload_generated_file_aiohttp(ACCESS_TOKEN, INSTANCE_URL, os.path.basename(FILE_PATH), FILE_SIZE_MB, TIMEOUT_MINUTES)
+    elif STREAM_GENERATED:
+        print("Using requests library (generator streamed as the request body)\n")
+        result = upload_generated_file(ACCESS_TOKEN, INSTANCE_URL, os.path.basename(FILE_PATH), FILE_SIZE_MB, TIMEOUT_MINUTES)
+    elif USE_AIOHTTP:
+        print("Using aiohttp (heartbeat every 5 seconds on the event loop)\n")
+        result = upload_file_aiohttp(ACCESS_TOKEN, INSTANCE_URL, UPLOAD_PATH, TIMEOUT_MINUTES)
+    elif USE_CURL:
         print("Using curl (with progress bar displayed in terminal)\n")
-        result = upload_file_with_curl_progress(INSTANCE_URL, ACCESS_TOKEN, FILE_PATH, TIMEOUT_MINUTES)
+        result = upload_file_with_curl_progress(INSTANCE_URL, ACCESS_TOKEN, UPLOAD_PATH, TIMEOUT_MINUTES)
     else:
         print("Using requests library (heartbeat every 5 seconds, maximum speed)\n")
-        result = upload_file_requests_with_heartbeat(ACCESS_TOKEN, INSTANCE_URL, FILE_PATH, TIMEOUT_MINUTES)
+        result = upload_file_requests_with_heartbeat(ACCESS_TOKEN, INSTANCE_URL, UPLOAD_PATH, TIMEOUT_MINUTES)
     
     if result:
         print(f"\n{'='*70}")